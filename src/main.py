@@ -13,7 +13,7 @@
 # --- SETUP INSTRUCTIONS ---
 #
 # 1. Install necessary Python libraries:
-#    pip install requests yfinance pandas
+#    pip install requests websocket-client
 #
 # 2. Install the ntfy app on your phone (available on iOS and Android):
 #    - Website: https://ntfy.sh/
@@ -30,11 +30,20 @@
 # The script will then run continuously, checking prices every minute.
 
 import requests
-import yfinance as yf
-import pandas as pd
+import argparse
+import asyncio
+import concurrent.futures
+import functools
+import hashlib
+import json
+import os
+import random
+import threading
 import time
 import datetime
 
+import websocket
+
 # --- CONFIGURATION ---
 
 # Notification Settings
@@ -45,22 +54,122 @@ NTFY_TOPIC = "carlos-fx-alerts-1066"
 USDCAD_TICKER = "CAD=X"
 USDCAD_ENTRY_TRIGGER = 1.3890
 
+# Optional streaming feed for USD/CAD (AllTick/Finage/iTick-style endpoint).
+# When set, ticks are pushed to us over a persistent WebSocket instead of
+# polling yfinance every minute, so the breakout alert fires within
+# milliseconds of the price crossing the trigger. Leave empty to keep the
+# HTTP polling fallback.
+USDCAD_WS_URL = ""
+USDCAD_WS_SYMBOL = "USDCAD"
+
 # Trade Parameters for GBP/USD
 GBPUSD_TICKER = "GBPUSD=X"
 # Bank of England Announcement Time (August 7, 2025, 11:00 UTC)
 BOE_ANNOUNCEMENT_UTC = datetime.datetime(2025, 8, 7, 11, 0, 0, tzinfo=datetime.timezone.utc)
+# Pre-rendered once for log lines, so the hot path never re-formats a constant.
+BOE_ANNOUNCEMENT_STR = BOE_ANNOUNCEMENT_UTC.strftime('%Y-%m-%d %H:%M')
+# Epoch seconds of the alert-window start (5 minutes before the event), so
+# the per-check compare is a plain float test with no datetime allocations.
+BOE_ALERT_EPOCH = (BOE_ANNOUNCEMENT_UTC - datetime.timedelta(minutes=5)).timestamp()
 
 # Script Settings
 CHECK_INTERVAL_SECONDS = 60  # Check prices every 60 seconds
+VERBOSE = True  # Set to False to silence per-check status lines (keeps the loop allocation-free)
+
+# Shared HTTP session so the TLS connection to ntfy.sh is set up once and
+# kept alive across alerts instead of re-handshaking on every POST.
+_SESSION = requests.Session()
+_SESSION.headers.update({"User-Agent": "fx-alerter"})
+_SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+
+# Yahoo's raw chart endpoint; we only ever need the newest close, so a
+# small JSON payload beats the DataFrame yfinance would build per poll.
+YAHOO_CHART_URL = "https://query1.finance.yahoo.com/v8/finance/chart"
+
+# --- PRICE CACHE ---
+
+# How long a fetched price stays valid. 1-minute candles can't change
+# faster than this, so a restart within the window reuses the last value
+# instead of hitting the network again.
+PRICE_CACHE_TTL_SECONDS = 30
+PRICE_CACHE_DIR = os.path.join(".cache", "usdcad")
+
+# Set by the --no-cache flag to bypass the cache entirely (for debugging).
+CACHE_DISABLED = False
+
+class FileCache:
+    """
+    Minimal on-disk JSON cache with a per-read TTL. Each entry is a small
+    file holding {"ts": <epoch>, "data": <value>}.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def _path(self, key):
+        return os.path.join(self.root, f"{key}.json")
+
+    def get(self, key, ttl):
+        """
+        Returns the cached value for key, or None if it is missing,
+        unreadable, or older than ttl seconds.
+        """
+        try:
+            with open(self._path(key)) as f:
+                entry = json.load(f)
+            if time.time() - entry["ts"] > ttl:
+                return None
+            return entry["data"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key, value):
+        """
+        Stores value for key, stamped with the current time.
+        """
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            with open(self._path(key), "w") as f:
+                json.dump({"ts": time.time(), "data": value}, f)
+        except OSError as e:
+            print(f"Error writing price cache: {e}")
+
+_PRICE_CACHE = FileCache(PRICE_CACHE_DIR)
+_PRICE_CACHE_KEY = hashlib.md5(f"{USDCAD_TICKER}:1d:1m".encode()).hexdigest()
 
 # --- CORE LOGIC ---
 
+def _with_retry(fn, *args, _attempts=3, **kwargs):
+    """
+    Calls fn, retrying transient network errors with exponential backoff
+    plus jitter. Client (4xx) errors and programming errors propagate
+    immediately; the last transient error is re-raised once the attempts
+    are exhausted.
+    """
+    backoff = 1.0
+    for attempt in range(_attempts):
+        try:
+            return fn(*args, **kwargs)
+        except requests.RequestException as e:
+            # A 4xx response is deterministic (bad request, auth, ...);
+            # re-sending it would just fail the same way.
+            status = getattr(e.response, "status_code", None)
+            if status is not None and 400 <= status < 500:
+                raise
+            if attempt == _attempts - 1:
+                raise
+            wait = backoff + random.random()
+            print(f"[{datetime.datetime.now()}] Transient network error: {e}; retrying in {wait:.1f}s")
+            time.sleep(wait)
+            backoff *= 2
+
 def send_notification(title, message, tags=""):
     """
     Sends a push notification using ntfy.sh.
     """
     try:
-        requests.post(
+        _with_retry(
+            _SESSION.post,
             f"https://ntfy.sh/{NTFY_TOPIC}",
             data=message.encode('utf-8'),
             headers={
@@ -72,6 +181,41 @@ def send_notification(title, message, tags=""):
     except Exception as e:
         print(f"Error sending notification: {e}")
 
+def _fx_open(now=None):
+    """
+    Whether the forex market is open: it closes Friday 22:00 UTC and
+    reopens Sunday 22:00 UTC.
+    """
+    now = now or datetime.datetime.now(datetime.timezone.utc)
+    wd = now.weekday()
+    if wd == 5:  # Saturday
+        return False
+    if wd == 6 and now.hour < 22:  # Sunday before the open
+        return False
+    if wd == 4 and now.hour >= 22:  # Friday after the close
+        return False
+    return True
+
+@functools.lru_cache(maxsize=8)
+def _fetch_last_close(ticker, minute_bucket):
+    """
+    Fetches the most recent close for ticker from Yahoo's chart endpoint.
+    Returns None if no close is available.
+
+    minute_bucket (the current epoch minute) keys the memoization: any
+    number of callers within the same minute share a single HTTP round
+    trip, and stale entries age out of the small LRU as the bucket
+    advances.
+    """
+    # 1d is the smallest range the v8 chart endpoint accepts; the JSON is
+    # still just one array of floats per quote field.
+    resp = _SESSION.get(f"{YAHOO_CHART_URL}/{ticker}", params={"range": "1d", "interval": "1m"}, timeout=5)
+    resp.raise_for_status()
+    closes = resp.json()["chart"]["result"][0]["indicators"]["quote"][0]["close"]
+    # The newest minute can be a null placeholder; walk back to the last
+    # real close.
+    return next((float(c) for c in reversed(closes) if c is not None), None)
+
 def check_usdcad_breakout(already_triggered):
     """
     Checks if USD/CAD has closed above the entry trigger price.
@@ -80,26 +224,147 @@ def check_usdcad_breakout(already_triggered):
     if already_triggered:
         return True # Don't send duplicate alerts
 
+    # The pair barely moves over the weekend; skip the network entirely
+    # while the market is closed.
+    if not _fx_open():
+        if VERBOSE:
+            print(f"[{datetime.datetime.now()}] FX market closed, skipping USD/CAD check.")
+        return False
+
     try:
-        # Fetch the last few minutes of data to check the most recent price
-        data = yf.download(USDCAD_TICKER, period="1d", interval="1m", auto_adjust=True, progress=False)
-        if data.empty:
-            print(f"[{datetime.datetime.now()}] No data for USD/CAD, skipping check.")
-            return False
+        # A fresh-enough cached price (e.g. after a restart mid-minute)
+        # saves the network round trip entirely.
+        last_price = None
+        if not CACHE_DISABLED:
+            last_price = _PRICE_CACHE.get(_PRICE_CACHE_KEY, PRICE_CACHE_TTL_SECONDS)
+
+        if last_price is None:
+            last_price = _with_retry(_fetch_last_close, USDCAD_TICKER, int(time.time() // 60))
+            if last_price is None:
+                print(f"[{datetime.datetime.now()}] No data for USD/CAD, skipping check.")
+                return False
 
-        last_price = data['Close'].iloc[-1].item()
-        print(f"[{datetime.datetime.now()}] Checking USD/CAD: Last Price = {last_price:.4f}, Trigger = {USDCAD_ENTRY_TRIGGER:.4f}")
+            if not CACHE_DISABLED:
+                _PRICE_CACHE.set(_PRICE_CACHE_KEY, last_price)
+        if VERBOSE:
+            print(f"[{datetime.datetime.now()}] Checking USD/CAD: Last Price = {last_price:.4f}, Trigger = {USDCAD_ENTRY_TRIGGER:.4f}")
 
         if last_price > USDCAD_ENTRY_TRIGGER:
             title = "🚨 USD/CAD TRADE ALERT 🚨"
             message = f"USD/CAD has broken above the entry trigger of {USDCAD_ENTRY_TRIGGER}. Last price: {last_price:.4f}"
             send_notification(title, message, tags="warning")
             return True # Mark as triggered
+    except requests.RequestException:
+        # Let network errors reach the watcher once _with_retry gives up,
+        # so its capped exponential backoff governs the repoll cadence
+        # during a sustained outage.
+        raise
     except Exception as e:
         print(f"Error checking USD/CAD: {e}")
 
     return False
 
+# Set once the streaming path has fired the breakout alert, so the reader
+# thread and its reconnect loop both know the WebSocket's job is done.
+_usdcad_stream_triggered = threading.Event()
+
+# Most recent WebSocketApp, kept so the evaluator can close the socket
+# (and unblock the reader thread) once the alert has fired.
+_ws_app = None
+
+def _on_ws_open(ws):
+    """
+    Subscribes to USD/CAD ticks as soon as the WebSocket connects.
+    """
+    if _usdcad_stream_triggered.is_set():
+        # The alert fired while this connection was being (re)established —
+        # the evaluator's close may have landed on a superseded app, so tear
+        # this one down ourselves instead of resubscribing and idling.
+        ws.close()
+        return
+    ws.send(json.dumps({"action": "subscribe", "symbols": [USDCAD_WS_SYMBOL]}))
+
+def _parse_tick(raw):
+    """
+    Extracts the price from a pushed tick frame, or None for heartbeats
+    and other non-tick frames.
+    """
+    try:
+        return float(json.loads(raw)["price"])
+    except (ValueError, KeyError, TypeError):
+        return None
+
+def _run_ws_reader(enqueue):
+    """
+    Feeds parsed tick prices from the WebSocket to enqueue until the
+    breakout alert has fired. Runs on a worker thread and reconnects
+    automatically if the feed drops.
+    """
+    global _ws_app
+
+    def on_message(ws, raw):
+        if _usdcad_stream_triggered.is_set():
+            ws.close()
+            return
+        price = _parse_tick(raw)
+        if price is not None:
+            enqueue(price)
+
+    while not _usdcad_stream_triggered.is_set():
+        _ws_app = websocket.WebSocketApp(
+            USDCAD_WS_URL,
+            on_open=_on_ws_open,
+            on_message=on_message,
+        )
+        _ws_app.run_forever(ping_interval=30)
+        # run_forever returns when the connection closes; unless the alert
+        # has fired, pause briefly and reconnect.
+        if not _usdcad_stream_triggered.is_set():
+            print(f"[{datetime.datetime.now()}] USD/CAD feed disconnected, reconnecting...")
+            time.sleep(1)
+
+async def _evaluate_ticks(queue):
+    """
+    Consumes tick prices from queue until one crosses the entry trigger,
+    then fires the breakout alert once.
+    """
+    while True:
+        price = await queue.get()
+        if price > USDCAD_ENTRY_TRIGGER:
+            title = "🚨 USD/CAD TRADE ALERT 🚨"
+            message = f"USD/CAD has broken above the entry trigger of {USDCAD_ENTRY_TRIGGER}. Last price: {price:.4f}"
+            _usdcad_stream_triggered.set()
+            await asyncio.to_thread(send_notification, title, message, "warning")
+            return
+
+async def usdcad_stream_watcher():
+    """
+    Streaming variant of the USD/CAD watch, split producer/consumer: the
+    reader thread parses frames as fast as they arrive and pushes prices
+    onto a queue, while the evaluator consumes them and fires the alert.
+    A slow ntfy POST therefore never stalls the socket read.
+    """
+    queue = asyncio.Queue(maxsize=1024)
+    loop = asyncio.get_running_loop()
+
+    def enqueue(price):
+        # Called from the reader thread. If the evaluator falls behind,
+        # drop the oldest tick: only the freshest price matters, and live
+        # reads must never block on stale ones.
+        def _put():
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(price)
+        loop.call_soon_threadsafe(_put)
+
+    reader = asyncio.create_task(asyncio.to_thread(_run_ws_reader, enqueue))
+    await _evaluate_ticks(queue)
+    # The triggered flag is now set; closing the live socket unblocks the
+    # reader thread so it can wind down.
+    if _ws_app is not None:
+        _ws_app.close()
+    await reader
+
 def check_boe_announcement(already_triggered):
     """
     Checks if it's time for the BoE announcement and sends an alert.
@@ -107,14 +372,12 @@ def check_boe_announcement(already_triggered):
     if already_triggered:
         return True # Don't send duplicate alerts
 
-    now_utc = datetime.datetime.now(datetime.timezone.utc)
-
-    # Alert a few minutes before the event
-    alert_window_start = BOE_ANNOUNCEMENT_UTC - datetime.timedelta(minutes=5)
+    if VERBOSE:
+        # Only build/format datetimes when the status line is wanted.
+        now_utc = datetime.datetime.now(datetime.timezone.utc)
+        print(f"[{datetime.datetime.now()}] Checking BoE time: Now (UTC) = {now_utc.strftime('%Y-%m-%d %H:%M')}, Event (UTC) = {BOE_ANNOUNCEMENT_STR}")
 
-    print(f"[{datetime.datetime.now()}] Checking BoE time: Now (UTC) = {now_utc.strftime('%Y-%m-%d %H:%M')}, Event (UTC) = {BOE_ANNOUNCEMENT_UTC.strftime('%Y-%m-%d %H:%M')}")
-
-    if now_utc >= alert_window_start:
+    if time.time() >= BOE_ALERT_EPOCH:
         title = "🔔 GBP/USD EVENT ALERT 🔔"
         message = f"Bank of England announcement is at 11:00 UTC. Monitor GBP/USD for post-announcement low to form and break."
         send_notification(title, message, tags="info")
@@ -122,44 +385,113 @@ def check_boe_announcement(already_triggered):
 
     return False
 
-def main():
+# Signalled when the script is done (or shutting down) so any watcher
+# parked in a wait wakes immediately instead of finishing its interval.
+_shutdown = asyncio.Event()
+
+async def _interruptible_sleep(seconds):
     """
-    Main loop to run the monitoring checks.
+    Waits up to `seconds`, returning early if shutdown has been signalled.
     """
-    print("--- Forex Trade Alerter Started ---")
-    print(f"Monitoring USD/CAD for breakout above {USDCAD_ENTRY_TRIGGER}")
-    print(f"Monitoring for BoE announcement on {BOE_ANNOUNCEMENT_UTC.strftime('%Y-%m-%d %H:%M UTC')}")
-    print(f"Notifications will be sent to ntfy.sh topic: {NTFY_TOPIC}")
-    print("-----------------------------------")
+    try:
+        await asyncio.wait_for(_shutdown.wait(), timeout=seconds)
+    except TimeoutError:
+        pass
 
-    # State flags to prevent sending repeated notifications
-    usdcad_triggered = False
-    boe_triggered = False
+async def usdcad_watcher():
+    """
+    Watches USD/CAD until the breakout alert has fired.
+    """
+    # With a streaming feed configured, ticks are pushed to us and flow
+    # through the producer/consumer pipeline instead of the poll loop.
+    if USDCAD_WS_URL:
+        await usdcad_stream_watcher()
+        return
 
-    while True:
+    triggered = False
+    # Schedule polls against the monotonic clock so the interval doesn't
+    # drift by the per-iteration work time (sleep(60) alone would make each
+    # cycle 60s + fetch time, slowly skewing off the minute boundary).
+    next_tick = time.monotonic()
+    backoff = 1.0
+    while not triggered and not _shutdown.is_set():
         try:
-            # Only check if the alert hasn't already been sent
-            if not usdcad_triggered:
-                usdcad_triggered = check_usdcad_breakout(usdcad_triggered)
+            # The price fetch blocks on HTTP; run it on a worker thread
+            # so the BoE watcher is never stuck behind the Yahoo RTT.
+            triggered = await asyncio.to_thread(check_usdcad_breakout, triggered)
+            backoff = 1.0
+            if triggered:
+                break
+            next_tick += CHECK_INTERVAL_SECONDS
+            if next_tick < time.monotonic() - CHECK_INTERVAL_SECONDS:
+                # Fell more than a full interval behind (suspend, long
+                # outage); snap forward rather than firing catch-up polls.
+                next_tick = time.monotonic()
+            await _interruptible_sleep(max(0.0, next_tick - time.monotonic()))
+        except Exception as e:
+            print(f"An unexpected error occurred in the USD/CAD watcher: {e}")
+            # Back off exponentially (capped, with jitter): transient errors
+            # retry within seconds, while a sustained outage isn't hammered
+            # every minute.
+            await _interruptible_sleep(min(backoff, 300.0) + random.random())
+            backoff *= 2
 
-            if not boe_triggered:
-                boe_triggered = check_boe_announcement(boe_triggered)
+async def boe_watcher():
+    """
+    Sleeps until the start of the BoE alert window, then fires the alert.
+    """
+    # The event time is known in advance, so there is no need to poll the
+    # clock every minute: one computed sleep lands us at the window start
+    # with sub-second precision. If the window has already opened (e.g.
+    # the script was restarted late), the alert fires immediately.
+    delay = BOE_ALERT_EPOCH - time.time()
+    if delay > 0:
+        print(f"[{datetime.datetime.now()}] BoE alert scheduled in {delay:.0f}s.")
+        await _interruptible_sleep(delay)
+    if _shutdown.is_set():
+        return
 
-            # If all alerts have been sent, the script's job is done.
-            if usdcad_triggered and boe_triggered:
-                print("All trade alerts have been triggered. Shutting down script.")
-                break
+    # The check's ntfy POST (and any retry sleeps) blocks; run it on a
+    # worker thread so the USD/CAD watcher never stalls behind it.
+    while not await asyncio.to_thread(check_boe_announcement, False):
+        # Only reachable if the clock moved backwards under us; re-check
+        # shortly rather than spinning.
+        await asyncio.sleep(1)
 
-            # Wait for the next interval
-            time.sleep(CHECK_INTERVAL_SECONDS)
+async def main():
+    """
+    Runs both monitoring checks concurrently until all alerts have fired.
+    """
+    print("--- Forex Trade Alerter Started ---")
+    print(f"Monitoring USD/CAD for breakout above {USDCAD_ENTRY_TRIGGER}")
+    print(f"Monitoring for BoE announcement on {BOE_ANNOUNCEMENT_UTC.strftime('%Y-%m-%d %H:%M UTC')}")
+    print(f"Notifications will be sent to ntfy.sh topic: {NTFY_TOPIC}")
+    print("-----------------------------------")
 
-        except KeyboardInterrupt:
-            print("\nScript stopped by user.")
-            break
-        except Exception as e:
-            print(f"An unexpected error occurred in the main loop: {e}")
-            # Wait a bit before retrying to avoid spamming errors
-            time.sleep(60)
+    # The two watchers already run concurrently via asyncio.gather; a small
+    # dedicated executor bounds the worker threads backing asyncio.to_thread
+    # (one per blocking call site) and is torn down cleanly on exit.
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    asyncio.get_running_loop().set_default_executor(executor)
+    try:
+        # Each alert is an independent coroutine; neither ever waits behind
+        # the other's network I/O, and each shuts itself down once it has
+        # fired.
+        await asyncio.gather(usdcad_watcher(), boe_watcher())
+        print("All trade alerts have been triggered. Shutting down script.")
+    finally:
+        # Wake anything still parked in an interval wait, then drop the pool.
+        _shutdown.set()
+        executor.shutdown(wait=False, cancel_futures=True)
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Forex trade alerter")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Always fetch fresh prices, bypassing the on-disk cache")
+    args = parser.parse_args()
+    CACHE_DISABLED = args.no_cache
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print("\nScript stopped by user.")
@@ -6,19 +6,38 @@
 
 import pytest
 from unittest.mock import MagicMock, patch
-import pandas as pd
+import asyncio
 import datetime
+import json
+import requests
+from freezegun import freeze_time
 from src import main  # Assuming your script is in src/main.py
 
 # --- Test Setup ---
 
-# Define a consistent "now" for time-sensitive tests
-# This is a time *before* the BoE announcement
-MOCK_NOW = datetime.datetime(2025, 8, 7, 10, 0, 0, tzinfo=datetime.timezone.utc)
+def _chart_response(closes):
+    """
+    Builds a mocked response from Yahoo's chart endpoint with the given
+    list of 1-minute closes.
+    """
+    resp = MagicMock()
+    resp.json.return_value = {
+        "chart": {"result": [{"indicators": {"quote": [{"close": closes}]}}]}
+    }
+    return resp
+
+@pytest.fixture(autouse=True)
+def disable_price_cache(monkeypatch):
+    """
+    Keeps tests hermetic: never read from or write to the on-disk price
+    cache, and start each test with a fresh in-process price memo.
+    """
+    monkeypatch.setattr(main, "CACHE_DISABLED", True)
+    main._fetch_last_close.cache_clear()
 
 # --- Test Cases ---
 
-@patch('src.main.requests.post')
+@patch('src.main._SESSION.post')
 def test_send_notification(mock_post):
     """
     Tests that send_notification calls the ntfy.sh API correctly.
@@ -38,56 +57,57 @@ def test_send_notification(mock_post):
         headers={"Title": title, "Tags": tags}
     )
 
+@patch('src.main._fx_open', return_value=True)
 @patch('src.main.send_notification')
-@patch('src.main.yf.download')
-def test_check_usdcad_breakout_below_trigger(mock_yf_download, mock_send_notification):
+@patch('src.main._SESSION.get')
+def test_check_usdcad_breakout_below_trigger(mock_get, mock_send_notification, mock_fx_open):
     """
     Tests USD/CAD check when the price is BELOW the trigger.
     It should NOT send a notification.
     """
     # Arrange
-    # Simulate yfinance returning data where the last price is below the trigger
-    mock_df = pd.DataFrame({'Close': [1.3850, 1.3860, 1.3870]})
-    mock_yf_download.return_value = mock_df
-    
+    # Simulate the chart endpoint returning a last price below the trigger
+    mock_get.return_value = _chart_response([1.3850, 1.3860, 1.3870])
+
     # Act
     result = main.check_usdcad_breakout(already_triggered=False)
 
     # Assert
     assert result is False, "Should return False as the trigger condition is not met."
-    mock_yf_download.assert_called_once_with(main.USDCAD_TICKER, period="1d", interval="1m", auto_adjust=True, progress=False)
+    mock_get.assert_called_once_with(f"{main.YAHOO_CHART_URL}/{main.USDCAD_TICKER}", params={"range": "1d", "interval": "1m"}, timeout=5)
     mock_send_notification.assert_not_called()
 
+@patch('src.main._fx_open', return_value=True)
 @patch('src.main.send_notification')
-@patch('src.main.yf.download')
-def test_check_usdcad_breakout_above_trigger(mock_yf_download, mock_send_notification):
+@patch('src.main._SESSION.get')
+def test_check_usdcad_breakout_above_trigger(mock_get, mock_send_notification, mock_fx_open):
     """
     Tests USD/CAD check when the price is ABOVE the trigger.
     It SHOULD send a notification.
     """
     # Arrange
-    # Simulate yfinance returning data where the last price is above the trigger
+    # Simulate the chart endpoint returning a last price above the trigger
     trigger_price = main.USDCAD_ENTRY_TRIGGER
-    mock_df = pd.DataFrame({'Close': [trigger_price - 0.0010, trigger_price + 0.0010]})
-    mock_yf_download.return_value = mock_df
+    mock_get.return_value = _chart_response([trigger_price - 0.0010, trigger_price + 0.0010])
 
     # Act
     result = main.check_usdcad_breakout(already_triggered=False)
 
     # Assert
     assert result is True, "Should return True as the trigger condition is met."
-    mock_yf_download.assert_called_once_with(main.USDCAD_TICKER, period="1d", interval="1m", auto_adjust=True, progress=False)
+    mock_get.assert_called_once_with(f"{main.YAHOO_CHART_URL}/{main.USDCAD_TICKER}", params={"range": "1d", "interval": "1m"}, timeout=5)
     mock_send_notification.assert_called_once()
 
+@patch('src.main._fx_open', return_value=True)
 @patch('src.main.send_notification')
-@patch('src.main.yf.download')
-def test_check_usdcad_breakout_no_data(mock_yf_download, mock_send_notification):
+@patch('src.main._SESSION.get')
+def test_check_usdcad_breakout_no_data(mock_get, mock_send_notification, mock_fx_open):
     """
-    Tests USD/CAD check when yfinance returns no data.
+    Tests USD/CAD check when the chart endpoint returns no usable closes.
     It should handle the case gracefully and not send a notification.
     """
     # Arrange
-    mock_yf_download.return_value = pd.DataFrame() # Empty dataframe
+    mock_get.return_value = _chart_response([None, None]) # Only null placeholders
 
     # Act
     result = main.check_usdcad_breakout(already_triggered=False)
@@ -96,38 +116,212 @@ def test_check_usdcad_breakout_no_data(mock_yf_download, mock_send_notification)
     assert result is False, "Should return False when no data is available."
     mock_send_notification.assert_not_called()
 
+@patch('src.main.time.sleep')
+def test_with_retry_recovers_from_transient_errors(mock_sleep):
+    """
+    Tests that _with_retry retries transient network errors and returns
+    the first successful result.
+    """
+    # Arrange
+    fn = MagicMock(side_effect=[requests.ConnectionError("boom"),
+                                requests.ConnectionError("boom"),
+                                1.3899])
+
+    # Act
+    result = main._with_retry(fn)
+
+    # Assert
+    assert result == 1.3899
+    assert fn.call_count == 3
+    assert mock_sleep.call_count == 2
+
+@patch('src.main.time.sleep')
+def test_with_retry_reraises_after_attempts_exhausted(mock_sleep):
+    """
+    Tests that _with_retry gives up and re-raises once its attempts are
+    exhausted.
+    """
+    # Arrange
+    fn = MagicMock(side_effect=requests.ConnectionError("boom"))
+
+    # Act / Assert
+    with pytest.raises(requests.ConnectionError):
+        main._with_retry(fn)
+    assert fn.call_count == 3
+
+@patch('src.main.time.sleep')
+@patch('src.main._fx_open', return_value=True)
+@patch('src.main.send_notification')
+@patch('src.main._SESSION.get')
+def test_check_usdcad_breakout_propagates_network_errors(mock_get, mock_send_notification, mock_fx_open, mock_sleep):
+    """
+    Tests that a persistent network failure escapes the check (once the
+    retries are exhausted) so the watcher's backoff takes over, instead
+    of being swallowed and re-polled at the normal cadence.
+    """
+    # Arrange
+    mock_get.side_effect = requests.ConnectionError("boom")
+
+    # Act / Assert
+    with pytest.raises(requests.ConnectionError):
+        main.check_usdcad_breakout(already_triggered=False)
+    mock_send_notification.assert_not_called()
+
+@patch('src.main.time.sleep')
+def test_with_retry_does_not_retry_client_errors(mock_sleep):
+    """
+    Tests that _with_retry re-raises deterministic 4xx client errors
+    immediately instead of retrying them.
+    """
+    # Arrange
+    error = requests.HTTPError("400 Client Error", response=MagicMock(status_code=400))
+    fn = MagicMock(side_effect=error)
+
+    # Act / Assert
+    with pytest.raises(requests.HTTPError):
+        main._with_retry(fn)
+    assert fn.call_count == 1
+    mock_sleep.assert_not_called()
+
+@patch('src.main._fx_open', return_value=False)
+@patch('src.main.send_notification')
+@patch('src.main._SESSION.get')
+def test_check_usdcad_breakout_market_closed(mock_get, mock_send_notification, mock_fx_open):
+    """
+    Tests USD/CAD check while the forex market is closed.
+    It should skip the network fetch entirely.
+    """
+    # Act
+    result = main.check_usdcad_breakout(already_triggered=False)
+
+    # Assert
+    assert result is False, "Should return False while the market is closed."
+    mock_get.assert_not_called()
+    mock_send_notification.assert_not_called()
+
+def test_fx_open_around_the_weekend():
+    """
+    Tests the market-hours predicate against the Friday 22:00 UTC close
+    and Sunday 22:00 UTC open.
+    """
+    utc = datetime.timezone.utc
+    assert main._fx_open(datetime.datetime(2025, 8, 7, 12, 0, tzinfo=utc))   # Thursday
+    assert main._fx_open(datetime.datetime(2025, 8, 8, 21, 0, tzinfo=utc))   # Friday, pre-close
+    assert not main._fx_open(datetime.datetime(2025, 8, 8, 22, 0, tzinfo=utc))  # Friday, post-close
+    assert not main._fx_open(datetime.datetime(2025, 8, 9, 12, 0, tzinfo=utc))  # Saturday
+    assert not main._fx_open(datetime.datetime(2025, 8, 10, 10, 0, tzinfo=utc)) # Sunday, pre-open
+    assert main._fx_open(datetime.datetime(2025, 8, 10, 22, 0, tzinfo=utc))  # Sunday, post-open
+
+def test_file_cache_roundtrip(tmp_path):
+    """
+    Tests that a value stored in the FileCache can be read back within
+    its TTL.
+    """
+    # Arrange
+    cache = main.FileCache(str(tmp_path / "cache"))
+
+    # Act
+    cache.set("abc123", 1.3899)
+
+    # Assert
+    assert cache.get("abc123", ttl=30) == 1.3899
+
+def test_file_cache_expiry_and_miss(tmp_path, monkeypatch):
+    """
+    Tests that the FileCache returns None for missing keys and for
+    entries older than the TTL.
+    """
+    # Arrange
+    cache = main.FileCache(str(tmp_path / "cache"))
+    cache.set("abc123", 1.3899)
+
+    # Act / Assert: unknown key is a miss
+    assert cache.get("missing", ttl=30) is None
+
+    # Act / Assert: jump the clock past the TTL and the entry expires
+    future = datetime.datetime.now().timestamp() + 10_000
+    monkeypatch.setattr(main.time, "time", lambda: future)
+    assert cache.get("abc123", ttl=30) is None
+
+def test_on_ws_open_subscribes_or_closes():
+    """
+    Tests that a new connection subscribes to ticks, unless the alert has
+    already fired, in which case it tears itself down immediately.
+    """
+    # Before the trigger: subscribe
+    main._usdcad_stream_triggered.clear()
+    mock_ws = MagicMock()
+    main._on_ws_open(mock_ws)
+    mock_ws.send.assert_called_once()
+    mock_ws.close.assert_not_called()
+
+    # After the trigger (e.g. a reconnect racing the shutdown): close
+    main._usdcad_stream_triggered.set()
+    mock_ws = MagicMock()
+    main._on_ws_open(mock_ws)
+    mock_ws.send.assert_not_called()
+    mock_ws.close.assert_called_once()
+
+    # Cleanup so later tests see a fresh flag
+    main._usdcad_stream_triggered.clear()
+
+def test_parse_tick():
+    """
+    Tests that _parse_tick extracts prices from tick frames and ignores
+    heartbeats and malformed frames.
+    """
+    price = main.USDCAD_ENTRY_TRIGGER + 0.0010
+    assert main._parse_tick(json.dumps({"symbol": "USDCAD", "price": price})) == price
+    assert main._parse_tick(json.dumps({"type": "heartbeat"})) is None
+    assert main._parse_tick("not json") is None
+
 @patch('src.main.send_notification')
-@patch('src.main.datetime')
-def test_check_boe_announcement_before_alert_time(mock_datetime, mock_send_notification):
+def test_evaluate_ticks_fires_on_breakout(mock_send_notification):
+    """
+    Tests that the tick evaluator skips prices below the trigger and
+    fires the breakout alert once a price crosses it.
+    """
+    # Arrange
+    main._usdcad_stream_triggered.clear()
+
+    async def run():
+        queue = asyncio.Queue()
+        queue.put_nowait(main.USDCAD_ENTRY_TRIGGER - 0.0010)
+        queue.put_nowait(main.USDCAD_ENTRY_TRIGGER + 0.0010)
+        await main._evaluate_ticks(queue)
+
+    # Act
+    asyncio.run(run())
+
+    # Assert
+    mock_send_notification.assert_called_once()
+    assert main._usdcad_stream_triggered.is_set()
+
+    # Cleanup so later tests see a fresh flag
+    main._usdcad_stream_triggered.clear()
+
+# Freeze well before the announcement / inside the 5-minute alert window.
+@freeze_time("2025-08-07 10:00:00")
+@patch('src.main.send_notification')
+def test_check_boe_announcement_before_alert_time(mock_send_notification):
     """
     Tests the BoE check when the current time is BEFORE the alert window.
     It should NOT send a notification.
     """
-    # Arrange
-    # Set the mocked "now" to be well before the announcement
-    mock_datetime.datetime.now.return_value = MOCK_NOW
-    mock_datetime.timedelta = datetime.timedelta
-    
     # Act
     result = main.check_boe_announcement(already_triggered=False)
-    
+
     # Assert
     assert result is False, "Should return False as it's not time yet."
     mock_send_notification.assert_not_called()
 
+@freeze_time("2025-08-07 10:56:00")
 @patch('src.main.send_notification')
-@patch('src.main.datetime')
-def test_check_boe_announcement_within_alert_time(mock_datetime, mock_send_notification):
+def test_check_boe_announcement_within_alert_time(mock_send_notification):
     """
     Tests the BoE check when the current time is WITHIN the alert window.
     It SHOULD send a notification.
     """
-    # Arrange
-    # Set the mocked "now" to be inside the 5-minute alert window
-    alert_time = main.BOE_ANNOUNCEMENT_UTC - datetime.timedelta(minutes=4)
-    mock_datetime.datetime.now.return_value = alert_time
-    mock_datetime.timedelta = datetime.timedelta
-
     # Act
     result = main.check_boe_announcement(already_triggered=False)
 